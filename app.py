@@ -1,54 +1,38 @@
 """
 Phoenix Air - Main Application with Prometheus Metrics
 """
-from flask import Flask, render_template, redirect, url_for, flash, Response
-from flask_login import LoginManager, current_user
-from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from dotenv import load_dotenv
-import os
 
-# Load environment variables
+# Load environment variables before modules read their settings
 load_dotenv()
 
-# Create Flask app
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize database with app
-from models import db, Airport, Aircraft, Flight, User, Booking, Baggage
-db.init_app(app)
-
-# Prometheus Metrics
-# Counters
-phoenix_requests_total = Counter('phoenix_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
-phoenix_bookings_total = Counter('phoenix_bookings_total', 'Total number of bookings created')
-phoenix_checkins_total = Counter('phoenix_checkins_total', 'Total number of check-ins completed')
-phoenix_baggage_total = Counter('phoenix_baggage_total', 'Total baggage items checked')
-phoenix_searches_total = Counter('phoenix_searches_total', 'Total flight searches performed')
-phoenix_user_registrations_total = Counter('phoenix_user_registrations_total', 'Total user registrations')
-
-# Gauges (current state)
-phoenix_active_users = Gauge('phoenix_active_users', 'Number of registered users')
-phoenix_available_flights = Gauge('phoenix_available_flights', 'Number of available flights')
-phoenix_total_revenue = Gauge('phoenix_total_revenue', 'Total booking revenue in dollars')
-phoenix_pending_checkins = Gauge('phoenix_pending_checkins', 'Number of bookings awaiting check-in')
-phoenix_completed_checkins = Gauge('phoenix_completed_checkins', 'Number of completed check-ins')
-phoenix_total_bookings = Gauge('phoenix_total_bookings', 'Total number of bookings')
-phoenix_total_baggage = Gauge('phoenix_total_baggage', 'Total baggage items')
-
-# Service Health (1 = UP, 0 = DOWN)
-phoenix_service_database = Gauge('phoenix_service_database', 'Database service health')
-phoenix_service_flight_search = Gauge('phoenix_service_flight_search', 'Flight search service health')
-phoenix_service_booking = Gauge('phoenix_service_booking', 'Booking service health')
-phoenix_service_checkin = Gauge('phoenix_service_checkin', 'Check-in service health')
-phoenix_service_baggage = Gauge('phoenix_service_baggage', 'Baggage tracking service health')
-phoenix_service_auth = Gauge('phoenix_service_auth', 'Authentication service health')
+from flask import Flask, render_template, Response
+from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
+import logging
+import os
+import time
+
+from models import db, Airport, Aircraft, User
+from services import admission
+from services import health as health_checks
+from services import lifecycle
+from services import events
+from services import passenger_search
+from services.jobs import update_queue_metrics
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# create_app should finish well inside a worker boot timeout
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', 1.0))
+# Reverse proxies in front of the app whose X-Forwarded-* headers are trusted
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+# Staff allowed to use agent tools (comma-separated emails)
+AGENT_EMAILS = frozenset(e.strip().lower() for e in os.getenv('AGENT_EMAILS', '').split(',') if e.strip())
 
 # Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
@@ -57,84 +41,103 @@ login_manager.login_message_category = 'info'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
-# Update metrics before each request
-@app.before_request
-def update_metrics():
-    """Update gauge metrics before each request"""
-    try:
-        from sqlalchemy import func
-        
-        # Update business metrics
-        phoenix_active_users.set(User.query.count())
-        phoenix_available_flights.set(Flight.query.count())
-        
-        total_bookings = Booking.query.count()
-        completed = Booking.query.filter_by(checked_in=True).count()
-        phoenix_total_bookings.set(total_bookings)
-        phoenix_pending_checkins.set(total_bookings - completed)
-        phoenix_completed_checkins.set(completed)
-        phoenix_total_baggage.set(Baggage.query.count())
-        
-        revenue = db.session.query(func.sum(Booking.total_price)).scalar() or 0
-        phoenix_total_revenue.set(float(revenue))
-        
-        # Update service health
-        phoenix_service_database.set(1)  # If we got here, DB is up
-        phoenix_service_flight_search.set(1)
-        phoenix_service_booking.set(1)
-        phoenix_service_checkin.set(1)
-        phoenix_service_baggage.set(1)
-        phoenix_service_auth.set(1)
-    except Exception as e:
-        # If any error, mark services as down
-        phoenix_service_database.set(0)
-
 # Prometheus metrics endpoint
-@app.route('/metrics')
-def metrics():
+def metrics_endpoint():
     """Expose Prometheus metrics"""
-    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+    # Service gauges are kept current by the health registry
+    health_checks.registry.results()
+    try:
+        metrics.update_business_metrics()
+        update_queue_metrics()
+    except Exception:
+        db.session.rollback()
+    body, content_type = metrics.exposition()
+    return Response(body, mimetype=content_type)
 
 # Homepage route
-@app.route('/')
 def index():
     airports = Airport.query.all()
     aircraft = Aircraft.query.all()
-    
-    return render_template('index.html', 
+
+    return render_template('index.html',
                          app_name='Phoenix Air',
                          airports=airports,
                          aircraft=aircraft)
 
 # System status page
-@app.route('/status')
 def status():
     return render_template('status.html')
 
-# Health check
-@app.route('/health')
+# Health check (liveness, served from the health registry cache)
 def health():
-    try:
-        result = db.session.execute(db.text('SELECT 1'))
+    database = health_checks.registry.result('database')
+    if database['status'] == 'UP':
         db_status = 'connected'
-    except Exception as e:
-        db_status = f'disconnected: {str(e)}'
-    
+    else:
+        db_status = f"disconnected: {database.get('error')}"
+
     return {
         'status': 'healthy',
         'app': 'Phoenix Air',
         'database': db_status
     }
 
-# Register blueprints
-from routes.booking import booking_bp
-from routes.auth import auth_bp
-from routes.monitoring import monitoring_bp
-
-app.register_blueprint(booking_bp)
-app.register_blueprint(auth_bp)
-app.register_blueprint(monitoring_bp)
+def create_app(config=None):
+    """Build a Phoenix Air app; `config` overrides environment settings"""
+    start_time = time.perf_counter()
+
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['STARTUP_BUDGET_SECONDS'] = STARTUP_BUDGET_SECONDS
+    app.config['TRUSTED_PROXIES'] = TRUSTED_PROXIES
+    app.config['AGENT_EMAILS'] = AGENT_EMAILS
+    if config:
+        app.config.update(config)
+
+    # Behind a proxy remote_addr is the proxy; rate limits need the real client
+    if app.config['TRUSTED_PROXIES']:
+        hops = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                          admission.engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    # Initialize database with app (connections are opened lazily)
+    db.init_app(app)
+
+    # Admission control runs before any other request hook touches the DB
+    admission.init_app(app)
+    login_manager.init_app(app)
+    health_checks.init_app(app)
+    lifecycle.init_app(app)
+    events.init_app(app)
+    passenger_search.init_app(app)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    app.add_url_rule('/', 'index', index)
+    app.add_url_rule('/status', 'status', status)
+    app.add_url_rule('/health', 'health', health)
+
+    # Register blueprints
+    from routes.booking import booking_bp
+    from routes.auth import auth_bp
+    from routes.monitoring import monitoring_bp
+    from routes.events import events_bp
+
+    app.register_blueprint(booking_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(monitoring_bp)
+    app.register_blueprint(events_bp)
+
+    elapsed = time.perf_counter() - start_time
+    metrics.phoenix_app_startup_seconds.set(elapsed)
+    if elapsed > app.config['STARTUP_BUDGET_SECONDS']:
+        logger.warning('create_app took %.3fs, over the %.3fs startup budget',
+                       elapsed, app.config['STARTUP_BUDGET_SECONDS'])
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,63 @@
+"""
+Startup Benchmark - Cold import and create_app time in fresh processes
+
+Usage: python benchmarks/startup_benchmark.py [--runs 10] [--budget 1.0]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is already imported
+PROBE = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'ADMISSION_ENABLED': False})
+created = time.perf_counter()
+print(imported - start, created - imported)
+"""
+
+
+def run_once():
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    import_time, create_time = (float(v) for v in output.split()[-2:])
+    return import_time, create_time
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Phoenix Air cold-start time')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget', type=float, default=float(os.getenv('STARTUP_BUDGET_SECONDS', 1.0)),
+                        help='Fail if p95 import + create_app exceeds this many seconds')
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    imports = [r[0] for r in results]
+    creates = [r[1] for r in results]
+    totals = [i + c for i, c in results]
+
+    print(f'{"phase":<12}{"median":>10}{"p95":>10}{"max":>10}')
+    for name, values in (('import', imports), ('create_app', creates), ('total', totals)):
+        print(f'{name:<12}{statistics.median(values):>10.3f}{percentile(values, 95):>10.3f}{max(values):>10.3f}')
+
+    p95 = percentile(totals, 95)
+    if p95 > args.budget:
+        print(f'FAIL: p95 startup {p95:.3f}s exceeds budget {args.budget:.3f}s')
+        return 1
+    print(f'OK: p95 startup {p95:.3f}s within budget {args.budget:.3f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
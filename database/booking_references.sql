@@ -0,0 +1,22 @@
+-- Phoenix Air - Registry of issued booking references
+-- Run once on existing databases: psql -d phoenix_air -f database/booking_references.sql
+-- New references are reserved here by routes/booking.py before the booking
+-- is written; the primary key keeps them unique across partitions and archives.
+
+CREATE TABLE IF NOT EXISTS booking_references (
+    booking_reference VARCHAR(6) PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO booking_references (booking_reference)
+SELECT booking_reference FROM bookings WHERE booking_reference IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+DO $$
+BEGIN
+    IF to_regclass('bookings_archive') IS NOT NULL THEN
+        INSERT INTO booking_references (booking_reference)
+        SELECT booking_reference FROM bookings_archive WHERE booking_reference IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+END $$;
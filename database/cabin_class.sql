@@ -0,0 +1,14 @@
+-- Phoenix Air - Record the cabin each booking was sold in
+-- Run once on existing databases: psql -d phoenix_air -f database/cabin_class.sql
+-- Bookings made before this had no cabin choice, so they default to economy.
+-- The archive gets the same column in the same position, so archival's
+-- INSERT ... SELECT * keeps working.
+
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS cabin_class VARCHAR(10) NOT NULL DEFAULT 'economy';
+
+DO $$
+BEGIN
+    IF to_regclass('bookings_archive') IS NOT NULL THEN
+        ALTER TABLE bookings_archive ADD COLUMN IF NOT EXISTS cabin_class VARCHAR(10) NOT NULL DEFAULT 'economy';
+    END IF;
+END $$;
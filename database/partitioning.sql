@@ -0,0 +1,113 @@
+-- Phoenix Air - Range partitioning and archive tables
+--
+-- Converts flights (by scheduled_departure) and bookings (by booking_date)
+-- into range-partitioned tables with monthly partitions, and creates the
+-- archive tables that completed flights are moved into.
+-- Run once: psql -d phoenix_air -f database/partitioning.sql
+-- Future partitions are then created by `flask --app app:create_app lifecycle ensure-partitions`
+-- (also scheduled automatically through the job queue).
+--
+-- Notes:
+--  * A partitioned table's primary key must include the partition key, so
+--    PKs become (flight_id, scheduled_departure) and (booking_id, booking_date).
+--  * Foreign keys *to* flights and bookings cannot reference flight_id /
+--    booking_id alone any more; they are dropped and enforced by the app.
+--  * booking_reference can no longer be UNIQUE on bookings itself; every
+--    issued reference is recorded in booking_references, whose primary key
+--    enforces uniqueness across partitions and the archive.
+
+BEGIN;
+
+ALTER TABLE baggage DROP CONSTRAINT IF EXISTS baggage_booking_id_fkey;
+ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_flight_id_fkey;
+
+-- Monthly partitions covering every month in [from_ts, to_ts]
+CREATE OR REPLACE FUNCTION phoenix_create_monthly_partitions(parent TEXT, from_ts TIMESTAMP, to_ts TIMESTAMP)
+RETURNS VOID AS $$
+DECLARE
+    month_start TIMESTAMP;
+BEGIN
+    FOR month_start IN
+        SELECT generate_series(date_trunc('month', from_ts), date_trunc('month', to_ts), INTERVAL '1 month')
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_p' || to_char(month_start, 'YYYY_MM'), parent,
+            month_start, month_start + INTERVAL '1 month'
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Flights ------------------------------------------------------------------
+ALTER TABLE flights RENAME TO flights_legacy;
+ALTER TABLE flights_legacy RENAME CONSTRAINT flights_pkey TO flights_legacy_pkey;
+
+CREATE TABLE flights (
+    LIKE flights_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    PRIMARY KEY (flight_id, scheduled_departure),
+    FOREIGN KEY (origin_airport) REFERENCES airports(airport_code),
+    FOREIGN KEY (destination_airport) REFERENCES airports(airport_code),
+    FOREIGN KEY (aircraft_id) REFERENCES aircraft(aircraft_id)
+) PARTITION BY RANGE (scheduled_departure);
+
+ALTER SEQUENCE flights_flight_id_seq OWNED BY flights.flight_id;
+CREATE TABLE flights_default PARTITION OF flights DEFAULT;
+
+SELECT phoenix_create_monthly_partitions('flights',
+    COALESCE((SELECT MIN(scheduled_departure) FROM flights_legacy), NOW()::TIMESTAMP),
+    GREATEST(COALESCE((SELECT MAX(scheduled_departure) FROM flights_legacy), NOW()::TIMESTAMP),
+             NOW()::TIMESTAMP + INTERVAL '3 months'));
+
+INSERT INTO flights SELECT * FROM flights_legacy;
+DROP TABLE flights_legacy;
+
+CREATE INDEX IF NOT EXISTS idx_flights_route_departure ON flights (origin_airport, destination_airport, scheduled_departure);
+CREATE INDEX IF NOT EXISTS idx_flights_flight_id ON flights (flight_id);
+CREATE INDEX IF NOT EXISTS idx_flights_arrival ON flights (scheduled_arrival);
+
+-- Bookings -----------------------------------------------------------------
+ALTER TABLE bookings RENAME TO bookings_legacy;
+ALTER TABLE bookings_legacy RENAME CONSTRAINT bookings_pkey TO bookings_legacy_pkey;
+ALTER TABLE bookings_legacy DROP CONSTRAINT IF EXISTS bookings_booking_reference_key;
+
+CREATE TABLE IF NOT EXISTS booking_references (
+    booking_reference VARCHAR(6) PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO booking_references (booking_reference)
+SELECT booking_reference FROM bookings_legacy WHERE booking_reference IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+CREATE TABLE bookings (
+    LIKE bookings_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    PRIMARY KEY (booking_id, booking_date),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+) PARTITION BY RANGE (booking_date);
+
+ALTER SEQUENCE bookings_booking_id_seq OWNED BY bookings.booking_id;
+CREATE TABLE bookings_default PARTITION OF bookings DEFAULT;
+
+SELECT phoenix_create_monthly_partitions('bookings',
+    COALESCE((SELECT MIN(booking_date) FROM bookings_legacy), NOW()::TIMESTAMP),
+    NOW()::TIMESTAMP + INTERVAL '3 months');
+
+INSERT INTO bookings SELECT * FROM bookings_legacy;
+DROP TABLE bookings_legacy;
+
+CREATE INDEX IF NOT EXISTS idx_bookings_reference ON bookings (booking_reference);
+CREATE INDEX IF NOT EXISTS idx_bookings_flight ON bookings (flight_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_user ON bookings (user_id, booking_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_booking_id ON bookings (booking_id);
+CREATE INDEX IF NOT EXISTS idx_baggage_booking ON baggage (booking_id);
+
+-- Archive tables (same column order, so rows move with INSERT ... SELECT *)
+CREATE TABLE IF NOT EXISTS flights_archive (LIKE flights INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS bookings_archive (LIKE bookings INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS baggage_archive (LIKE baggage INCLUDING DEFAULTS);
+
+CREATE INDEX IF NOT EXISTS idx_flights_archive_flight ON flights_archive (flight_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_reference ON bookings_archive (booking_reference);
+CREATE INDEX IF NOT EXISTS idx_baggage_archive_tag ON baggage_archive (baggage_tag);
+
+COMMIT;
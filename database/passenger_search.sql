@@ -0,0 +1,14 @@
+-- Phoenix Air - Trigram indexes for agent passenger search
+-- Run once: psql -d phoenix_air -f database/passenger_search.sql
+-- Expressions must match PgTrigramSearch in services/passenger_search.py.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_bookings_name_trgm ON bookings
+    USING gin ((lower(coalesce(customer_first_name, '') || ' ' || coalesce(customer_last_name, ''))) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_bookings_email_trgm ON bookings
+    USING gin ((lower(coalesce(customer_email, ''))) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_bookings_phone_trgm ON bookings
+    USING gin ((regexp_replace(coalesce(customer_phone, ''), '\D', '', 'g')) gin_trgm_ops);
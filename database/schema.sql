@@ -67,3 +67,26 @@ INSERT INTO aircraft (registration, model, total_seats, economy_seats, business_
 ('N12345', 'Boeing 737-800', 175, 150, 20, 5),
 ('N23456', 'Airbus A320', 180, 156, 20, 4)
 ON CONFLICT (registration) DO NOTHING;
+
+-- Background jobs (outbox + work queue)
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id SERIAL PRIMARY KEY,
+    queue VARCHAR(50) NOT NULL DEFAULT 'default',
+    task VARCHAR(100) NOT NULL,
+    payload JSON,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (queue, status, run_at);
+
+-- Issued booking references (unique even once bookings are partitioned)
+CREATE TABLE IF NOT EXISTS booking_references (
+    booking_reference VARCHAR(6) PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration - one app per worker, shared Prometheus metrics
+"""
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# SSE streams hold a thread each; admission caps them at SSE_MAX_CONNECTIONS
+# (at most threads / 2) per worker so page loads and bookings keep threads.
+# That suits dashboards and agents, not thousands of passenger streams.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+wsgi_app = 'wsgi:app'
+
+# Each worker imports and builds its own app after fork, so no DB
+# connections or metric values leak between workers
+preload_app = False
+
+
+def on_starting(server):
+    """Start with an empty multiprocess metrics directory"""
+    path = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/phoenix-prometheus')
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the aggregate"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,85 @@
+"""
+Prometheus Metrics - Shared Definitions and Exposition
+"""
+from prometheus_client import Counter, Gauge, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from sqlalchemy import func
+from models import db, Flight, Booking, User, Baggage
+import os
+
+# Set by gunicorn.conf.py so every worker writes to a shared directory
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Counters
+phoenix_requests_total = Counter('phoenix_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
+phoenix_bookings_total = Counter('phoenix_bookings_total', 'Total number of bookings created')
+phoenix_checkins_total = Counter('phoenix_checkins_total', 'Total number of check-ins completed')
+phoenix_baggage_total = Counter('phoenix_baggage_total', 'Total baggage items checked')
+phoenix_searches_total = Counter('phoenix_searches_total', 'Total flight searches performed')
+phoenix_user_registrations_total = Counter('phoenix_user_registrations_total', 'Total user registrations')
+
+# Gauges (current state) - every worker sees the same DB, so report the latest value
+phoenix_active_users = Gauge('phoenix_active_users', 'Number of registered users', multiprocess_mode='mostrecent')
+phoenix_available_flights = Gauge('phoenix_available_flights', 'Number of available flights', multiprocess_mode='mostrecent')
+phoenix_total_revenue = Gauge('phoenix_total_revenue', 'Total booking revenue in dollars', multiprocess_mode='mostrecent')
+phoenix_pending_checkins = Gauge('phoenix_pending_checkins', 'Number of bookings awaiting check-in', multiprocess_mode='mostrecent')
+phoenix_completed_checkins = Gauge('phoenix_completed_checkins', 'Number of completed check-ins', multiprocess_mode='mostrecent')
+phoenix_total_bookings = Gauge('phoenix_total_bookings', 'Total number of bookings', multiprocess_mode='mostrecent')
+phoenix_total_baggage = Gauge('phoenix_total_baggage', 'Total baggage items', multiprocess_mode='mostrecent')
+
+# Service Health (1 = UP, 0 = DOWN)
+phoenix_service_database = Gauge('phoenix_service_database', 'Database service health', multiprocess_mode='mostrecent')
+phoenix_service_flight_search = Gauge('phoenix_service_flight_search', 'Flight search service health', multiprocess_mode='mostrecent')
+phoenix_service_booking = Gauge('phoenix_service_booking', 'Booking service health', multiprocess_mode='mostrecent')
+phoenix_service_checkin = Gauge('phoenix_service_checkin', 'Check-in service health', multiprocess_mode='mostrecent')
+phoenix_service_baggage = Gauge('phoenix_service_baggage', 'Baggage tracking service health', multiprocess_mode='mostrecent')
+phoenix_service_auth = Gauge('phoenix_service_auth', 'Authentication service health', multiprocess_mode='mostrecent')
+
+# Startup
+phoenix_app_startup_seconds = Gauge('phoenix_app_startup_seconds', 'Time spent in create_app', multiprocess_mode='max')
+
+
+def business_snapshot():
+    """Business totals; booking figures come from a single aggregate query"""
+    total_bookings, total_checkins, revenue = db.session.query(
+        func.count(Booking.booking_id),
+        func.count(Booking.booking_id).filter(Booking.checked_in.is_(True)),
+        func.sum(Booking.total_price)
+    ).one()
+    return {
+        'total_bookings': total_bookings,
+        'total_checkins': total_checkins,
+        'pending_checkins': total_bookings - total_checkins,
+        'total_users': User.query.count(),
+        'total_baggage': Baggage.query.count(),
+        'total_flights': Flight.query.count(),
+        'total_revenue': float(revenue or 0),
+    }
+
+
+def update_business_metrics():
+    """Refresh business gauges (called at scrape time, not per request)"""
+    snapshot = business_snapshot()
+    phoenix_active_users.set(snapshot['total_users'])
+    phoenix_available_flights.set(snapshot['total_flights'])
+    phoenix_total_bookings.set(snapshot['total_bookings'])
+    phoenix_pending_checkins.set(snapshot['pending_checkins'])
+    phoenix_completed_checkins.set(snapshot['total_checkins'])
+    phoenix_total_baggage.set(snapshot['total_baggage'])
+    phoenix_total_revenue.set(snapshot['total_revenue'])
+    return snapshot
+
+
+def registry():
+    """Registry to expose: aggregated across workers in multiprocess mode"""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    from prometheus_client import multiprocess
+    
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def exposition():
+    """Body and content type for the /metrics endpoint"""
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
@@ -76,6 +76,7 @@ class Booking(db.Model):
     __tablename__ = 'bookings'
     booking_id = db.Column(db.Integer, primary_key=True)
     booking_reference = db.Column(db.String(6), unique=True)
+    cabin_class = db.Column(db.String(10), nullable=False, default='economy')
     customer_email = db.Column(db.String(100))
     customer_first_name = db.Column(db.String(50))
     customer_last_name = db.Column(db.String(50))
@@ -105,3 +106,27 @@ class Baggage(db.Model):
     
     # Relationship
     booking = db.relationship('Booking', backref='baggage_items')
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    job_id = db.Column(db.Integer, primary_key=True)
+    queue = db.Column(db.String(50), nullable=False, default='default')
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_jobs_claim', 'queue', 'status', 'run_at'),
+    )
+
+class BookingReference(db.Model):
+    """Issued booking references; the PK keeps them unique across partitions and archives"""
+    __tablename__ = 'booking_references'
+    booking_reference = db.Column(db.String(6), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,14 +1,29 @@
 """
 Authentication Routes - Login, Register, Logout
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_user, logout_user, login_required, current_user
+from functools import wraps
 from models import db, User, Booking
 from datetime import datetime
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+def is_agent(user):
+    """Staff accounts listed in AGENT_EMAILS; registering never grants this"""
+    return user.is_authenticated and user.email.lower() in current_app.config['AGENT_EMAILS']
+
+def agent_required(view):
+    """login_required, plus 403 for signed-in users who aren't agents"""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not is_agent(current_user):
+            return jsonify({'error': 'Agent access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     """User registration"""
@@ -1,22 +1,46 @@
 """
 Booking Routes - Flight Search and Booking
 """
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, jsonify, flash, redirect
 from flask_login import current_user
+from routes.auth import agent_required
 from datetime import datetime
 from sqlalchemy import func
-from models import db, Airport, Flight, Booking, Baggage
+from sqlalchemy.exc import IntegrityError
+from models import db, Airport, Flight, Booking, BookingReference, Baggage
+from services.events import emit, baggage_event, flight_event
+from services.fares import CABINS, SEAT_LAYOUTS, QuoteError, price_flights, quote_fare, redeem_quote
+from services.health import registry
+from services.jobs import enqueue
+from services.lifecycle import live_departure_range
+from services.passenger_search import SearchUnavailable, search_bookings, search_ready
 import random
 import string
 
 # Create blueprint
 booking_bp = Blueprint('booking', __name__, url_prefix='/booking')
 
+def new_booking_reference():
+    """Reserve a random 6-character reference in the current transaction
+
+    booking_references enforces uniqueness (partitioned bookings can't), so
+    a collision, including one with a concurrent booking, is retried.
+    """
+    while True:
+        booking_ref = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        try:
+            with db.session.begin_nested():
+                db.session.add(BookingReference(booking_reference=booking_ref))
+            return booking_ref
+        except IntegrityError:
+            continue
+
 @booking_bp.route('/search', methods=['GET', 'POST'])
 def search():
     """Flight search page"""
     airports = Airport.query.all()
     flights = []
+    fares = {}
     search_performed = False
     
     if request.method == 'POST':
@@ -28,22 +52,31 @@ def search():
         
         if origin and destination and date_str:
             search_date = datetime.strptime(date_str, '%Y-%m-%d')
+            # A range on the partition key lets Postgres prune to one partition
+            day_start, day_end = live_departure_range(search_date)
             flights = Flight.query.filter(
                 Flight.origin_airport == origin,
                 Flight.destination_airport == destination,
-                func.date(Flight.scheduled_departure) == search_date.date()
+                Flight.scheduled_departure >= day_start,
+                Flight.scheduled_departure < day_end
             ).order_by(Flight.scheduled_departure).all()
+            fares = price_flights(flights)
     
     return render_template('booking/search.html', 
                          airports=airports, 
                          flights=flights,
+                         fares=fares,
                          search_performed=search_performed)
 
 @booking_bp.route('/select/<int:flight_id>')
 def select_flight(flight_id):
     """Select a flight and enter passenger details"""
     flight = Flight.query.get_or_404(flight_id)
-    return render_template('booking/passenger_details.html', flight=flight)
+    cabin = request.args.get('cabin', 'economy')
+    if cabin not in CABINS:
+        cabin = 'economy'
+    quote = quote_fare(flight, cabin)
+    return render_template('booking/passenger_details.html', flight=flight, quote=quote)
 
 @booking_bp.route('/confirm/<int:flight_id>', methods=['POST'])
 def confirm_booking(flight_id):
@@ -54,13 +87,35 @@ def confirm_booking(flight_id):
     last_name = request.form.get('last_name')
     email = request.form.get('email')
     phone = request.form.get('phone')
-    num_passengers = int(request.form.get('num_passengers', 1))
+    num_passengers = request.form.get('num_passengers', type=int)
+    cabin = request.form.get('cabin', 'economy')
+
+    if num_passengers is None or num_passengers < 1:
+        quote = quote_fare(flight, cabin if cabin in CABINS else 'economy')
+        return render_template('booking/passenger_details.html', flight=flight, quote=quote,
+                             error="Please enter at least one passenger.")
+
+    # Charge the price that was quoted, not a freshly computed one
+    try:
+        _, total_price = redeem_quote(request.form.get('quote', ''), flight_id, cabin, num_passengers)
+    except QuoteError as e:
+        quote = quote_fare(flight, cabin if cabin in CABINS else 'economy')
+        return render_template('booking/passenger_details.html', flight=flight, quote=quote,
+                             error=f"{e}. Please review the updated fare and confirm again.")
+    
+    # Lock the flight row so concurrent bookings can't oversell the cabin
+    db.session.refresh(flight, with_for_update=True)
+    available_col = CABINS[cabin][1]
+    if getattr(flight, available_col) < num_passengers:
+        quote = quote_fare(flight, cabin)
+        return render_template('booking/passenger_details.html', flight=flight, quote=quote,
+                             error="Not enough seats left in this cabin.")
     
-    booking_ref = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    total_price = float(flight.price_economy) * num_passengers
+    booking_ref = new_booking_reference()
     
     booking = Booking(
         booking_reference=booking_ref,
+        cabin_class=cabin,
         customer_email=email,
         customer_first_name=first_name,
         customer_last_name=last_name,
@@ -74,7 +129,8 @@ def confirm_booking(flight_id):
     )
     
     db.session.add(booking)
-    flight.available_economy -= num_passengers
+    setattr(flight, available_col, getattr(flight, available_col) - num_passengers)
+    enqueue('booking.confirmation_email', {'booking_reference': booking_ref})
     db.session.commit()
     
     return render_template('booking/confirmation.html', booking=booking)
@@ -90,9 +146,9 @@ def view_booking():
         last_name = request.form.get('last_name', '').strip()
         
         if booking_ref and last_name:
-            booking = Booking.query.filter_by(
-                booking_reference=booking_ref,
-                customer_last_name=last_name
+            booking = Booking.query.filter(
+                Booking.booking_reference == booking_ref,
+                func.lower(Booking.customer_last_name) == last_name.lower()
             ).first()
             
             if not booking:
@@ -102,6 +158,25 @@ def view_booking():
     
     return render_template('booking/view.html', booking=booking, error=error)
 
+@booking_bp.route('/agent/search')
+@agent_required
+def agent_search():
+    """Ranked booking lookup by reference, partial name, email or phone"""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    
+    try:
+        results = search_bookings(query, limit)
+    except SearchUnavailable as e:
+        return jsonify({'query': query, 'error': str(e)}), 503
+    
+    return jsonify({
+        'query': query,
+        'results': results,
+        # False while the in-process index is still loading at startup
+        'complete': search_ready()
+    })
+
 @booking_bp.route('/checkin/<booking_ref>')
 def checkin(booking_ref):
     """Check-in for a flight"""
@@ -111,8 +186,10 @@ def checkin(booking_ref):
     if booking.checked_in:
         return render_template('booking/boarding_pass.html', booking=booking)
     
-    # Show seat selection and baggage
-    return render_template('booking/checkin.html', booking=booking)
+    # Show seat selection (for the cabin that was bought) and baggage
+    seat_rows, seat_letters = SEAT_LAYOUTS[booking.cabin_class or 'economy']
+    return render_template('booking/checkin.html', booking=booking,
+                         seat_rows=seat_rows, seat_letters=seat_letters)
 
 @booking_bp.route('/checkin/confirm/<booking_ref>', methods=['POST'])
 def confirm_checkin(booking_ref):
@@ -148,6 +225,7 @@ def confirm_checkin(booking_ref):
             
             db.session.add(baggage)
     
+    enqueue('checkin.boarding_pass', {'booking_reference': booking.booking_reference})
     db.session.commit()
     
     return render_template('booking/boarding_pass.html', booking=booking)
@@ -174,8 +252,6 @@ def track_baggage():
 @booking_bp.route('/baggage/admin/<baggage_tag>', methods=['GET', 'POST'])
 def admin_baggage(baggage_tag):
     """Admin page to update baggage status (DEMO)"""
-    from flask import flash, redirect
-    
     baggage = Baggage.query.filter_by(baggage_tag=baggage_tag).first_or_404()
     
     if request.method == 'POST':
@@ -186,6 +262,8 @@ def admin_baggage(baggage_tag):
         baggage.current_location = new_location
         baggage.last_updated = datetime.now()
         
+        enqueue('baggage.status_notification', {'baggage_tag': baggage.baggage_tag, 'status': new_status})
+        emit(f'baggage:{baggage.baggage_tag}', baggage_event(baggage))
         db.session.commit()
         
         flash(f'Baggage {baggage_tag} status updated to {new_status}!', 'success')
@@ -193,33 +271,30 @@ def admin_baggage(baggage_tag):
     
     return render_template('booking/admin_baggage.html', baggage=baggage)
 
+@booking_bp.route('/flight/admin/<int:flight_id>', methods=['POST'])
+@agent_required
+def admin_flight(flight_id):
+    """Update flight status/gate (DEMO) and push it to live subscribers"""
+    flight = Flight.query.get_or_404(flight_id)
+    
+    flight.status = request.form.get('status', flight.status)
+    flight.gate = request.form.get('gate', flight.gate)
+    
+    emit(f'flight:{flight.flight_id}', flight_event(flight))
+    db.session.commit()
+    
+    return jsonify(flight_event(flight))
+
 @booking_bp.route('/health-check')
 def health_check():
     """Detailed system health check"""
-    from flask import jsonify
-    
+    results = registry.results()
     health_status = {
-        'status': 'healthy',
-        'checks': {}
+        'status': 'healthy' if all(r['status'] == 'UP' for r in results.values()) else 'unhealthy',
+        'checks': {
+            name: 'healthy' if r['status'] == 'UP' else f"unhealthy: {r.get('error')}"
+            for name, r in results.items()
+        }
     }
     
-    # Check database
-    try:
-        db.session.execute(db.text('SELECT 1'))
-        db.session.execute(db.text('SELECT COUNT(*) FROM flights'))
-        health_status['checks']['database'] = 'healthy'
-    except Exception as e:
-        health_status['checks']['database'] = f'unhealthy: {str(e)}'
-        health_status['status'] = 'unhealthy'
-    
-    # Check tables exist
-    try:
-        Airport.query.first()
-        Flight.query.first()
-        Booking.query.first()
-        health_status['checks']['tables'] = 'healthy'
-    except Exception as e:
-        health_status['checks']['tables'] = f'unhealthy: {str(e)}'
-        health_status['status'] = 'unhealthy'
-    
     return jsonify(health_status)
@@ -0,0 +1,67 @@
+"""
+Event Routes - Server-Sent Event Streams for Live Updates
+"""
+from flask import Blueprint, Response, stream_with_context
+from models import db, Baggage, Flight
+from metrics import business_snapshot
+from services.events import publisher, baggage_event, flight_event, health_snapshot
+from services.health import registry
+from datetime import datetime
+import json
+
+events_bp = Blueprint('events', __name__, url_prefix='/events')
+
+def format_event(topic, data):
+    """SSE frame; the event name is the topic without its key"""
+    return f"event: {topic.split(':')[0]}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(topics, initial=()):
+    """Stream published events for `topics`, starting with `initial` ones"""
+    subscription = publisher.subscribe(topics)
+    # Don't hold a pooled DB connection for the life of the stream
+    db.session.remove()
+    
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            for topic, data in initial:
+                yield format_event(topic, data)
+            for item in subscription.listen():
+                yield ': keep-alive\n\n' if item is None else format_event(*item)
+        finally:
+            publisher.unsubscribe(subscription)
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@events_bp.route('/baggage/<baggage_tag>')
+def baggage_stream(baggage_tag):
+    """Live status/location for one bag"""
+    baggage = Baggage.query.filter_by(baggage_tag=baggage_tag.upper()).first_or_404()
+    topic = f'baggage:{baggage.baggage_tag}'
+    return sse_response([topic], [(topic, baggage_event(baggage))])
+
+@events_bp.route('/flights/<int:flight_id>')
+def flight_stream(flight_id):
+    """Live status/gate for one flight"""
+    flight = Flight.query.get_or_404(flight_id)
+    topic = f'flight:{flight.flight_id}'
+    return sse_response([topic], [(topic, flight_event(flight))])
+
+@events_bp.route('/monitoring')
+def monitoring_stream():
+    """Health and business metric snapshots for the dashboard"""
+    initial = [('health', health_snapshot(registry.results()))]
+    # Reuse the snapshot other watchers already receive when there is one
+    snapshot = publisher.latest('metrics')
+    if snapshot is None:
+        try:
+            snapshot = business_snapshot()
+            snapshot['timestamp'] = datetime.now().isoformat()
+        except Exception:
+            db.session.rollback()
+    if snapshot is not None:
+        initial.append(('metrics', snapshot))
+    return sse_response(['health', 'metrics'], initial)
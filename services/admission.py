@@ -0,0 +1,271 @@
+"""
+Admission Control - Rate Limiting, Concurrency Caps and Load Shedding
+"""
+from flask import g, jsonify, request, session
+from prometheus_client import Counter, Gauge
+from sqlalchemy.pool import QueuePool
+import math
+import os
+import threading
+import time
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() != 'false'
+# Optional shared bucket store so limits hold across workers and hosts
+RATE_LIMIT_STORAGE_URL = os.getenv('RATE_LIMIT_STORAGE_URL')
+
+# Concurrency caps are shares of one gunicorn worker's threads
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 32))
+# Threads only booking writes may use, so reads can never starve them
+WRITE_RESERVED_THREADS = max(1, int(os.getenv('WRITE_RESERVED_THREADS', GUNICORN_THREADS // 4)))
+# Every class except 'write' also draws from this shared pool
+SHARED_THREADS = max(1, GUNICORN_THREADS - WRITE_RESERVED_THREADS)
+# Under gthread every open SSE stream holds a worker thread for its whole
+# life, so streams may use at most half of them; the rest serve requests
+SSE_MAX_CONNECTIONS = max(1, min(int(os.getenv('SSE_MAX_CONNECTIONS', GUNICORN_THREADS // 4)), GUNICORN_THREADS // 2))
+
+# Per endpoint class: token refill rate (req/s), bucket size, concurrent requests
+CLASS_LIMITS = {
+    'read': {'rate': 2.0, 'burst': 20, 'concurrency': max(1, SHARED_THREADS * 3 // 4)},
+    'write': {'rate': 0.5, 'burst': 10, 'concurrency': GUNICORN_THREADS},
+    'default': {'rate': 5.0, 'burst': 50, 'concurrency': max(1, SHARED_THREADS // 2)},
+    # Long-lived SSE connections: few (re)connects, each held open
+    'stream': {'rate': 0.5, 'burst': 10, 'concurrency': SSE_MAX_CONNECTIONS},
+}
+
+READ_ENDPOINTS = {
+    'booking.search', 'booking.select_flight', 'booking.view_booking',
+    'booking.checkin', 'booking.track_baggage', 'booking.admin_baggage',
+    'booking.agent_search',
+}
+WRITE_ENDPOINTS = {
+    'booking.confirm_booking', 'booking.confirm_checkin', 'booking.admin_baggage',
+    'booking.admin_flight',
+}
+STREAM_BLUEPRINTS = {'events'}
+# Probes and scrapes must never be throttled
+EXEMPT_ENDPOINTS = {'metrics', 'health', 'static', 'booking.health_check'}
+EXEMPT_BLUEPRINTS = {'monitoring'}
+
+# Shed reads (then everything but booking writes) as DB pool waits grow
+SHED_READ_WAIT_MS = float(os.getenv('SHED_READ_WAIT_MS', 50))
+SHED_DEFAULT_WAIT_MS = float(os.getenv('SHED_DEFAULT_WAIT_MS', 200))
+POOL_WAIT_DECAY_SECONDS = 5.0
+# Seconds before a new DB connection attempt gives up (libpq connect_timeout)
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 5))
+
+phoenix_requests_rejected_total = Counter('phoenix_requests_rejected_total', 'Requests rejected by admission control', ['endpoint_class', 'reason'])
+phoenix_db_pool_wait_ms = Gauge('phoenix_db_pool_wait_ms', 'Smoothed time spent waiting for a DB connection', multiprocess_mode='max')
+
+
+class PoolWaitTracker:
+    """Time-decayed moving average of DB connection checkout wait"""
+    
+    def __init__(self, alpha=0.2, decay_seconds=POOL_WAIT_DECAY_SECONDS):
+        self.alpha = alpha
+        self.decay_seconds = decay_seconds
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _decayed(self, now):
+        return self._value * math.exp(-(now - self._updated) / self.decay_seconds)
+    
+    def observe(self, wait_ms):
+        now = time.monotonic()
+        with self._lock:
+            self._value = self.alpha * wait_ms + (1 - self.alpha) * self._decayed(now)
+            self._updated = now
+        phoenix_db_pool_wait_ms.set(self._value)
+    
+    def current(self):
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+pool_wait = PoolWaitTracker()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection
+
+    Only the get() on the pool's internal queue is timed; opening a new
+    connection under the overflow limit is connect latency, not pool wait.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        get = self._pool.get
+        
+        def timed_get(block=True, timeout=None):
+            start = time.perf_counter()
+            try:
+                return get(block, timeout)
+            finally:
+                pool_wait.observe((time.perf_counter() - start) * 1000)
+        
+        self._pool.get = timed_get
+
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options that enable pool wait tracking"""
+    if database_uri and database_uri.startswith('postgresql'):
+        # An unreachable database fails connects quickly instead of hanging callers
+        return {'poolclass': TimedQueuePool, 'pool_pre_ping': True,
+                'connect_args': {'connect_timeout': DB_CONNECT_TIMEOUT}}
+    return {}
+
+
+class MemoryBucketStore:
+    """In-process token buckets, shared by threads of one worker"""
+    
+    MAX_KEYS = 100000
+    
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def take(self, key, rate, burst):
+        """Take one token; return 0 if allowed, else seconds until retry"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.MAX_KEYS:
+                self._evict(now)
+        return wait
+    
+    def _evict(self, now):
+        # Buckets idle long enough to have refilled are equivalent to new ones
+        idle = max(limits['burst'] / limits['rate'] for limits in CLASS_LIMITS.values())
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated > idle]:
+            del self._buckets[key]
+
+
+class RedisBucketStore:
+    """Token buckets kept in Redis so every worker shares the same limits"""
+    
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[2])
+    local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[3])
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+    
+    def __init__(self, url):
+        import redis
+        
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.SCRIPT)
+        self._fallback = MemoryBucketStore()
+    
+    def take(self, key, rate, burst):
+        try:
+            return float(self._take(keys=[f'phoenix:rl:{key}'], args=[rate, burst, time.time()]))
+        except self._errors:
+            # Fail open to per-process limits rather than rejecting traffic
+            return self._fallback.take(key, rate, burst)
+
+
+def _make_store():
+    # redis is optional and only imported when a shared store is configured
+    if RATE_LIMIT_STORAGE_URL:
+        try:
+            return RedisBucketStore(RATE_LIMIT_STORAGE_URL)
+        except ImportError:
+            pass
+    return MemoryBucketStore()
+
+
+bucket_store = _make_store()
+_semaphores = {name: threading.BoundedSemaphore(limits['concurrency']) for name, limits in CLASS_LIMITS.items()}
+_shared_semaphore = threading.BoundedSemaphore(SHARED_THREADS)
+
+
+def endpoint_class():
+    """Classify the current request, or None if it is exempt"""
+    endpoint = request.endpoint or ''
+    if endpoint in EXEMPT_ENDPOINTS or request.blueprint in EXEMPT_BLUEPRINTS:
+        return None
+    if request.blueprint in STREAM_BLUEPRINTS:
+        return 'stream'
+    if endpoint in WRITE_ENDPOINTS and request.method == 'POST':
+        return 'write'
+    if endpoint in READ_ENDPOINTS:
+        return 'read'
+    return 'default'
+
+
+def client_key():
+    """Rate limit per logged-in user, else per client IP (see TRUSTED_PROXIES)"""
+    user_id = session.get('_user_id')
+    if user_id:
+        return f'user:{user_id}'
+    return f'ip:{request.remote_addr}'
+
+
+def _reject(klass, reason, status, retry_after):
+    phoenix_requests_rejected_total.labels(endpoint_class=klass, reason=reason).inc()
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({
+        'error': 'Too many requests' if status == 429 else 'Service busy, please retry',
+        'retry_after': retry_after
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def admit():
+    """before_request hook: shed, rate limit and cap concurrency"""
+    klass = endpoint_class()
+    if klass is None:
+        return None
+    
+    # Booking writes keep priority: only reads and page views are shed
+    wait_ms = pool_wait.current()
+    if (klass == 'read' and wait_ms > SHED_READ_WAIT_MS) or \
+            (klass == 'default' and wait_ms > SHED_DEFAULT_WAIT_MS):
+        return _reject(klass, 'shed', 503, POOL_WAIT_DECAY_SECONDS)
+    
+    limits = CLASS_LIMITS[klass]
+    retry_after = bucket_store.take(f'{klass}:{client_key()}', limits['rate'], limits['burst'])
+    if retry_after:
+        return _reject(klass, 'rate_limited', 429, retry_after)
+    
+    semaphore = _semaphores[klass]
+    if not semaphore.acquire(blocking=False):
+        return _reject(klass, 'concurrency', 503, 1)
+    held = [semaphore]
+    if klass != 'write':
+        if not _shared_semaphore.acquire(blocking=False):
+            semaphore.release()
+            return _reject(klass, 'concurrency', 503, 1)
+        held.append(_shared_semaphore)
+    g.admission_semaphores = held
+    return None
+
+
+def release(exc=None):
+    """teardown_request hook: free the concurrency slots"""
+    for semaphore in g.pop('admission_semaphores', ()):
+        semaphore.release()
+
+
+def init_app(app):
+    """Register admission control; call before other before_request hooks"""
+    if not app.config.get('ADMISSION_ENABLED', ADMISSION_ENABLED):
+        return
+    app.before_request(admit)
+    app.teardown_request(release)
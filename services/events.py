@@ -0,0 +1,242 @@
+"""
+Live Events - One Publisher Fanning Out Updates to SSE Clients
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from datetime import datetime
+from metrics import business_snapshot
+from models import db
+from services.health import registry
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'phoenix_events'
+SUBSCRIBER_QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+# How often health/metric snapshots are pushed while anyone is watching
+SNAPSHOT_INTERVAL = float(os.getenv('EVENTS_SNAPSHOT_INTERVAL', 5))
+
+
+class Subscription:
+    """One connected client: a bounded queue of (topic, data) events"""
+    
+    def __init__(self, topics):
+        self.topics = tuple(topics)
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    
+    def put(self, item):
+        # A slow client loses its oldest events rather than stalling everyone
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def listen(self, heartbeat=HEARTBEAT_SECONDS):
+        """Yield events, or None every `heartbeat` seconds of silence"""
+        while True:
+            try:
+                yield self._queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield None
+
+
+class Publisher:
+    """In-process fan-out from topics to subscriptions"""
+    
+    def __init__(self):
+        self._subscriptions = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._pump = None
+    
+    def subscribe(self, topics):
+        subscription = Subscription(topics)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscriptions.setdefault(topic, set()).add(subscription)
+        if self._pump is not None:
+            self._pump.ensure_started()
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscriptions.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[topic]
+    
+    def publish(self, topic, data):
+        with self._lock:
+            self._latest[topic] = data
+            subscribers = list(self._subscriptions.get(topic, ()))
+        for subscription in subscribers:
+            subscription.put((topic, data))
+        return len(subscribers)
+    
+    def latest(self, topic):
+        """Last data published on a topic in this process, if any"""
+        return self._latest.get(topic)
+    
+    def has_subscribers(self, topic):
+        return bool(self._subscriptions.get(topic))
+    
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscriptions.values() for s in subscribers})
+
+
+publisher = Publisher()
+
+
+def emit(topic, data):
+    """Publish an event once the current transaction commits
+
+    On PostgreSQL this is a pg_notify, which every process receives on its
+    single LISTEN connection. Elsewhere the event is published locally
+    after commit as a stand-in.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('SELECT pg_notify(:channel, :payload)'), {
+            'channel': CHANNEL,
+            'payload': json.dumps({'topic': topic, 'data': data}, default=str)
+        })
+    else:
+        # Join the session's transaction so a rollback discards the event
+        db.session.connection()
+        db.session.info.setdefault('pending_events', []).append((topic, data))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    for topic, data in session.info.pop('pending_events', ()):
+        publisher.publish(topic, data)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop('pending_events', None)
+
+
+def baggage_event(baggage):
+    return {
+        'baggage_tag': baggage.baggage_tag,
+        'status': baggage.status,
+        'location': baggage.current_location,
+        'last_updated': baggage.last_updated.isoformat() if baggage.last_updated else None,
+    }
+
+
+def flight_event(flight):
+    return {
+        'flight_id': flight.flight_id,
+        'flight_number': flight.flight_number,
+        'status': flight.status,
+        'gate': flight.gate,
+    }
+
+
+class EventPump:
+    """Per-process thread: one LISTEN connection plus periodic snapshots"""
+    
+    def __init__(self, app):
+        self.app = app
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='event-pump', daemon=True)
+                    self._thread.start()
+    
+    def _run(self):
+        with self.app.app_context():
+            use_notify = db.engine.dialect.name == 'postgresql'
+        connection = None
+        next_snapshot = 0.0
+        while True:
+            try:
+                if use_notify and connection is None:
+                    connection = self._listen()
+                
+                wait = max(0.0, next_snapshot - time.monotonic())
+                if connection is not None:
+                    self._drain(connection, wait)
+                else:
+                    time.sleep(wait)
+                
+                if time.monotonic() >= next_snapshot:
+                    self._snapshots()
+                    next_snapshot = time.monotonic() + SNAPSHOT_INTERVAL
+            except Exception as e:
+                logger.error('Event pump error: %s', e)
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                    connection = None
+                time.sleep(1)
+    
+    def _listen(self):
+        """Open a dedicated (unpooled) connection and LISTEN on it"""
+        with self.app.app_context():
+            raw = db.engine.raw_connection()
+        raw.detach()
+        connection = raw.driver_connection
+        connection.autocommit = True
+        connection.cursor().execute(f'LISTEN {CHANNEL}')
+        return connection
+    
+    def _drain(self, connection, timeout):
+        if select.select([connection], [], [], timeout)[0]:
+            connection.poll()
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                message = json.loads(notify.payload)
+                publisher.publish(message['topic'], message['data'])
+    
+    def _snapshots(self):
+        """Compute health/metrics once for every watching client"""
+        if not (publisher.has_subscribers('health') or publisher.has_subscribers('metrics')):
+            return
+        
+        with self.app.app_context():
+            try:
+                if publisher.has_subscribers('health'):
+                    publisher.publish('health', health_snapshot(registry.results()))
+                if publisher.has_subscribers('metrics'):
+                    snapshot = business_snapshot()
+                    snapshot['timestamp'] = datetime.now().isoformat()
+                    publisher.publish('metrics', snapshot)
+            finally:
+                db.session.remove()
+
+
+def health_snapshot(results):
+    """Same shape as /monitoring/health/all"""
+    return {
+        'overall_status': 'UP' if all(r['status'] == 'UP' for r in results.values()) else 'DEGRADED',
+        'services': results,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def init_app(app):
+    """The pump thread starts with the first subscriber, not at import"""
+    publisher._pump = EventPump(app)
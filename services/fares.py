@@ -0,0 +1,171 @@
+"""
+Fare Engine - Cabin-Class Pricing and Signed Fare Quotes
+"""
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from decimal import Decimal, ROUND_HALF_UP
+from models import Aircraft
+import os
+import threading
+import time
+
+# Cabin -> (price column, availability column, aircraft capacity column)
+CABINS = {
+    'economy': ('price_economy', 'available_economy', 'economy_seats'),
+    'business': ('price_business', 'available_business', 'business_seats'),
+    'first': ('price_first', 'available_first', 'first_class_seats'),
+}
+
+# Cabin -> (seat rows, seat letters) offered at check-in
+SEAT_LAYOUTS = {
+    'first': (range(1, 3), 'ACDF'),
+    'business': (range(3, 7), 'ACDF'),
+    'economy': (range(10, 20), 'ABCDEF'),
+}
+
+# Load factor thresholds (highest first) and the multiplier applied above each
+LOAD_FACTOR_TIERS = (
+    (Decimal('0.90'), Decimal('1.50')),
+    (Decimal('0.75'), Decimal('1.25')),
+    (Decimal('0.50'), Decimal('1.10')),
+)
+
+CENT = Decimal('0.01')
+
+# Quotes stay redeemable for QUOTE_TTL seconds; identical requests reuse a
+# cached quote for QUOTE_CACHE_TTL seconds so search and confirm agree.
+QUOTE_TTL = int(os.getenv('FARE_QUOTE_TTL', 900))
+QUOTE_CACHE_TTL = int(os.getenv('FARE_QUOTE_CACHE_TTL', 60))
+QUOTE_CACHE_MAX = 10000
+
+_quote_cache = {}
+_quote_lock = threading.Lock()
+
+
+class QuoteError(ValueError):
+    """Raised when a fare quote is invalid, expired or does not match"""
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='fare-quote')
+
+
+def load_factor(available, capacity):
+    """Fraction of seats already sold in a cabin"""
+    if not capacity:
+        return Decimal('1') if not available else Decimal('0')
+    sold = max(capacity - (available or 0), 0)
+    return min(Decimal(sold) / Decimal(capacity), Decimal('1'))
+
+
+def fare_multiplier(factor):
+    """Dynamic pricing multiplier for a given load factor"""
+    for threshold, multiplier in LOAD_FACTOR_TIERS:
+        if factor >= threshold:
+            return multiplier
+    return Decimal('1')
+
+
+def unit_fare(base_price, available, capacity):
+    """Per-passenger fare for one cabin, rounded to cents"""
+    multiplier = fare_multiplier(load_factor(available, capacity))
+    return (Decimal(base_price) * multiplier).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _build_quote(flight_id, cabin, unit_price, available):
+    """Create a signed quote and store it in the cache"""
+    issued = time.time()
+    token = _serializer().dumps({
+        'flight_id': flight_id,
+        'cabin': cabin,
+        'unit_price': str(unit_price),
+    })
+    quote = {
+        'flight_id': flight_id,
+        'cabin': cabin,
+        'unit_price': unit_price,
+        'available': available,
+        'token': token,
+        'expires_at': issued + QUOTE_TTL,
+    }
+    with _quote_lock:
+        if len(_quote_cache) >= QUOTE_CACHE_MAX:
+            _purge_expired(issued)
+        _quote_cache[(flight_id, cabin)] = (issued + QUOTE_CACHE_TTL, quote)
+    return quote
+
+
+def _purge_expired(now):
+    for key in [k for k, (expires, _) in _quote_cache.items() if expires <= now]:
+        del _quote_cache[key]
+    if len(_quote_cache) >= QUOTE_CACHE_MAX:
+        _quote_cache.clear()
+
+
+def _cached_quote(flight_id, cabin, available):
+    """Return a cached quote if it is fresh and seat counts are unchanged"""
+    with _quote_lock:
+        entry = _quote_cache.get((flight_id, cabin))
+    if entry and entry[0] > time.time() and entry[1]['available'] == available:
+        return entry[1]
+    return None
+
+
+def quote_fare(flight, cabin='economy'):
+    """Quote the per-passenger fare for one flight and cabin"""
+    if cabin not in CABINS:
+        raise QuoteError(f'Unknown cabin class: {cabin}')
+    price_col, avail_col, capacity_col = CABINS[cabin]
+    available = getattr(flight, avail_col)
+
+    quote = _cached_quote(flight.flight_id, cabin, available)
+    if quote:
+        return quote
+
+    capacity = getattr(flight.aircraft, capacity_col) if flight.aircraft else None
+    price = unit_fare(getattr(flight, price_col), available, capacity)
+    return _build_quote(flight.flight_id, cabin, price, available)
+
+
+def price_flights(flights):
+    """Batch-price every cabin of a search result set
+
+    Aircraft capacities are loaded in a single query and each cabin is
+    priced column-wise, so a result page costs one extra query instead of
+    one per flight. Returns {flight_id: {cabin: quote}}.
+    """
+    aircraft_ids = {f.aircraft_id for f in flights if f.aircraft_id is not None}
+    capacities = {}
+    if aircraft_ids:
+        capacities = {
+            a.aircraft_id: a for a in Aircraft.query.filter(Aircraft.aircraft_id.in_(aircraft_ids))
+        }
+
+    fares = {f.flight_id: {} for f in flights}
+    for cabin, (price_col, avail_col, capacity_col) in CABINS.items():
+        available = [getattr(f, avail_col) for f in flights]
+        bases = [getattr(f, price_col) for f in flights]
+        seats = [getattr(capacities.get(f.aircraft_id), capacity_col, None) for f in flights]
+
+        for flight, avail, base, capacity in zip(flights, available, bases, seats):
+            quote = _cached_quote(flight.flight_id, cabin, avail)
+            if not quote:
+                quote = _build_quote(flight.flight_id, cabin, unit_fare(base, avail, capacity), avail)
+            fares[flight.flight_id][cabin] = quote
+    return fares
+
+
+def redeem_quote(token, flight_id, cabin, num_passengers):
+    """Verify a signed quote and return the total price it guarantees"""
+    try:
+        payload = _serializer().loads(token, max_age=QUOTE_TTL)
+    except SignatureExpired:
+        raise QuoteError('Fare quote has expired')
+    except BadSignature:
+        raise QuoteError('Fare quote is invalid')
+
+    if payload.get('flight_id') != flight_id or payload.get('cabin') != cabin:
+        raise QuoteError('Fare quote does not match this flight')
+
+    unit_price = Decimal(payload['unit_price'])
+    return unit_price, (unit_price * num_passengers).quantize(CENT, rounding=ROUND_HALF_UP)
@@ -0,0 +1,206 @@
+"""
+Health Registry - Shared Liveness/Readiness Checks with Cached Results
+"""
+from datetime import datetime
+from models import db
+import metrics
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Probes are answered from cache for this long; the refresher runs more often
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 15))
+HEALTH_REFRESH_INTERVAL = float(os.getenv('HEALTH_REFRESH_INTERVAL', 5))
+# A probe query taking longer than this fails instead of hanging the check
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', 2))
+
+
+class Probe:
+    """Runs each distinct SQL statement once per evaluation, on its own connection"""
+    
+    def __init__(self):
+        self._results = {}
+        self._conn = None
+    
+    def __call__(self, sql):
+        if sql not in self._results:
+            try:
+                self._results[sql] = (self._connection().execute(db.text(sql)).first(), None)
+            except Exception as e:
+                self.close()
+                self._results[sql] = (None, e)
+        row, error = self._results[sql]
+        if error is not None:
+            raise error
+        return row
+    
+    def _connection(self):
+        if self._conn is None:
+            self._conn = db.engine.connect()
+            if self._conn.dialect.name == 'postgresql':
+                self._conn.execute(db.text("SELECT set_config('statement_timeout', :ms, true)"),
+                                   {'ms': str(int(HEALTH_PROBE_TIMEOUT * 1000))})
+        return self._conn
+    
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+class HealthRegistry:
+    """Named checks evaluated together, cached and mirrored to gauges"""
+    
+    def __init__(self, cache_ttl=HEALTH_CACHE_TTL):
+        self.cache_ttl = cache_ttl
+        self._checks = {}
+        self._results = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def register(self, name, kind='readiness', gauge=None):
+        """Decorator adding a check; `kind` is 'liveness' or 'readiness'"""
+        def decorator(fn):
+            self._checks[name] = {'fn': fn, 'kind': kind, 'gauge': gauge}
+            return fn
+        return decorator
+    
+    def evaluate(self):
+        """Run every check now and cache the outcome"""
+        probe = Probe()
+        try:
+            results = self._run_checks(probe)
+        finally:
+            probe.close()
+        self._results = results
+        self._checked_at = time.monotonic()
+        return results
+    
+    def _run_checks(self, probe):
+        results = {}
+        for name, check in self._checks.items():
+            start_time = time.time()
+            result = {'service': name, 'kind': check['kind']}
+            try:
+                check['fn'](probe)
+                result['status'] = 'UP'
+            except Exception as e:
+                result['status'] = 'DOWN'
+                result['error'] = str(e)
+            result['response_time_ms'] = round((time.time() - start_time) * 1000, 2)
+            result['timestamp'] = datetime.now().isoformat()
+            results[name] = result
+            
+            if check['gauge'] is not None:
+                check['gauge'].set(1 if result['status'] == 'UP' else 0)
+        return results
+    
+    def results(self, kind=None):
+        """Cached results, re-evaluated (by one caller at a time) when stale
+
+        Callers never queue behind an evaluation that is already running:
+        they get the previous results marked `stale`, or, before the first
+        evaluation has finished, DOWN after waiting HEALTH_PROBE_TIMEOUT.
+        """
+        if time.monotonic() - self._checked_at > self.cache_ttl:
+            if self._results:
+                acquired = self._lock.acquire(blocking=False)
+            else:
+                acquired = self._lock.acquire(timeout=HEALTH_PROBE_TIMEOUT)
+            if acquired:
+                try:
+                    if time.monotonic() - self._checked_at > self.cache_ttl:
+                        self.evaluate()
+                finally:
+                    self._lock.release()
+        
+        age = round(time.monotonic() - self._checked_at, 1) if self._results else None
+        stale = not self._results or age > self.cache_ttl
+        results = {
+            name: dict(self._results.get(name) or self._pending(name, check), stale=stale, age_seconds=age)
+            for name, check in self._checks.items()
+        }
+        if kind is None:
+            return results
+        return {name: r for name, r in results.items() if r['kind'] == kind}
+    
+    @staticmethod
+    def _pending(name, check):
+        return {'service': name, 'kind': check['kind'], 'status': 'DOWN',
+                'error': 'Health check has not completed yet'}
+    
+    def result(self, name):
+        return self.results()[name]
+    
+    def is_healthy(self, kind=None):
+        return all(r['status'] == 'UP' for r in self.results(kind).values())
+    
+    def start_background_refresh(self, app, interval=HEALTH_REFRESH_INTERVAL):
+        """Keep the cache warm so probes are answered from cache"""
+        def refresh():
+            while True:
+                with app.app_context():
+                    try:
+                        with self._lock:
+                            self.evaluate()
+                    except Exception as e:
+                        logger.error('Health refresh failed: %s', e)
+                    finally:
+                        db.session.remove()
+                time.sleep(interval)
+        
+        thread = threading.Thread(target=refresh, name='health-refresh', daemon=True)
+        thread.start()
+        return thread
+
+
+registry = HealthRegistry()
+
+
+# Liveness: is the database reachable at all
+@registry.register('database', kind='liveness', gauge=metrics.phoenix_service_database)
+def check_database(probe):
+    probe('SELECT 1')
+
+
+# Readiness: can each service read what it needs (LIMIT 1, never COUNT(*))
+@registry.register('flight_search', gauge=metrics.phoenix_service_flight_search)
+def check_flight_search(probe):
+    if probe('SELECT 1 FROM flights LIMIT 1') is None:
+        raise Exception("No flights available")
+
+
+@registry.register('booking', gauge=metrics.phoenix_service_booking)
+def check_booking(probe):
+    probe('SELECT 1 FROM bookings LIMIT 1')
+    probe("SELECT 1 FROM flights WHERE status = 'scheduled' LIMIT 1")
+
+
+@registry.register('checkin', gauge=metrics.phoenix_service_checkin)
+def check_checkin(probe):
+    probe('SELECT 1 FROM bookings LIMIT 1')
+    probe('SELECT 1 FROM flights LIMIT 1')
+
+
+@registry.register('baggage_tracking', gauge=metrics.phoenix_service_baggage)
+def check_baggage(probe):
+    probe('SELECT 1 FROM baggage LIMIT 1')
+
+
+@registry.register('authentication', gauge=metrics.phoenix_service_auth)
+def check_authentication(probe):
+    probe('SELECT 1 FROM users LIMIT 1')
+
+
+def init_app(app):
+    """Start the background refresher unless disabled (tests, job workers)"""
+    if not app.config.get('HEALTH_BACKGROUND_REFRESH', not app.config.get('TESTING')):
+        return
+    if 'phoenix_health' not in app.extensions:
+        app.extensions['phoenix_health'] = registry.start_background_refresh(app)
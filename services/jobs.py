@@ -0,0 +1,188 @@
+"""
+Background Jobs - DB-Backed Queue for Post-Booking Side Effects
+"""
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import func, or_
+from datetime import datetime, timedelta
+from models import db, Job
+import logging
+import os
+import random
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = int(os.getenv('JOB_RETRY_BASE_DELAY', 10))
+RETRY_MAX_DELAY = int(os.getenv('JOB_RETRY_MAX_DELAY', 3600))
+# A running job whose worker died is reclaimed after this many seconds
+VISIBILITY_TIMEOUT = int(os.getenv('JOB_VISIBILITY_TIMEOUT', 300))
+# Queues consumed by worker.py when none are given
+QUEUES = ('default', 'maintenance')
+
+# Registered task handlers: name -> callable(payload)
+TASKS = {}
+
+phoenix_jobs_processed_total = Counter('phoenix_jobs_processed_total', 'Background jobs processed', ['task', 'outcome'])
+phoenix_job_duration_seconds = Histogram('phoenix_job_duration_seconds', 'Background job run time', ['task'])
+phoenix_job_queue_depth = Gauge('phoenix_job_queue_depth', 'Jobs waiting to run', ['queue'], multiprocess_mode='mostrecent')
+phoenix_job_queue_oldest_age_seconds = Gauge('phoenix_job_queue_oldest_age_seconds', 'Age of the oldest waiting job', ['queue'], multiprocess_mode='mostrecent')
+
+
+def task(name):
+    """Register a function as a background task handler"""
+    def decorator(fn):
+        TASKS[name] = fn
+        return fn
+    return decorator
+
+
+def enqueue(task_name, payload=None, queue='default', delay=0, max_attempts=5):
+    """Add a job to the current session without committing
+
+    The job is written in the same transaction as the caller's changes
+    (outbox pattern), so it only becomes visible if the caller commits.
+    """
+    job = Job(
+        queue=queue,
+        task=task_name,
+        payload=payload or {},
+        status='pending',
+        max_attempts=max_attempts,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        created_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+
+def claim_jobs(queues=('default',), limit=10):
+    """Claim due jobs using SELECT ... FOR UPDATE SKIP LOCKED
+
+    Concurrent workers skip rows another worker has locked, so each job is
+    handed to exactly one worker without an external broker.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=VISIBILITY_TIMEOUT)
+    jobs = Job.query.filter(
+        Job.queue.in_(queues),
+        or_(
+            (Job.status == 'pending') & (Job.run_at <= now),
+            (Job.status == 'running') & (Job.locked_at < stale)
+        )
+    ).order_by(Job.run_at).limit(limit).with_for_update(skip_locked=True).all()
+    
+    claimed, abandoned = [], []
+    for job in jobs:
+        # A stale job that already used its last attempt most likely took
+        # its worker down with it; don't hand it to another one
+        if job.status == 'running' and job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.locked_at = None
+            job.last_error = f'Worker stopped during attempt {job.attempts} of {job.max_attempts}'
+            abandoned.append(job)
+            continue
+        job.status = 'running'
+        job.locked_at = now
+        claimed.append(job)
+    db.session.commit()
+    
+    for job in abandoned:
+        logger.error('Job %s (%s) failed permanently: %s', job.job_id, job.task, job.last_error)
+        phoenix_jobs_processed_total.labels(task=job.task, outcome='failed').inc()
+    return claimed
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at RETRY_MAX_DELAY"""
+    delay = min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def run_job(job):
+    """Run a claimed job and record success, retry or failure"""
+    handler = TASKS.get(job.task)
+    start_time = time.time()
+    # Count the attempt up front so a crash mid-handler still uses up a retry
+    job.attempts += 1
+    db.session.commit()
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for task {job.task}')
+        handler(job.payload or {})
+        db.session.commit()
+        job.status = 'done'
+        job.last_error = None
+        outcome = 'done'
+    except Exception as e:
+        db.session.rollback()
+        job.last_error = f'{e}\n{traceback.format_exc()}'[:4000]
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            outcome = 'failed'
+            logger.error('Job %s (%s) failed permanently: %s', job.job_id, job.task, e)
+        else:
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+            outcome = 'retried'
+            logger.warning('Job %s (%s) failed, retrying: %s', job.job_id, job.task, e)
+    job.locked_at = None
+    db.session.commit()
+    
+    phoenix_job_duration_seconds.labels(task=job.task).observe(time.time() - start_time)
+    phoenix_jobs_processed_total.labels(task=job.task, outcome=outcome).inc()
+    return outcome
+
+
+def queue_stats():
+    """Depth and oldest-job age for every queue with waiting jobs"""
+    now = datetime.utcnow()
+    rows = db.session.query(
+        Job.queue, func.count(Job.job_id), func.min(Job.created_at)
+    ).filter(Job.status.in_(('pending', 'running'))).group_by(Job.queue).all()
+    
+    return {
+        queue: {
+            'depth': depth,
+            'oldest_age_seconds': round((now - oldest).total_seconds(), 2) if oldest else 0
+        }
+        for queue, depth, oldest in rows
+    }
+
+
+# Queues that have had a gauge value; drained ones are reported as 0
+_reported_queues = set(QUEUES)
+
+
+def update_queue_metrics():
+    """Refresh queue depth/age gauges"""
+    stats = queue_stats()
+    _reported_queues.update(stats)
+    for queue in _reported_queues:
+        values = stats.get(queue, {'depth': 0, 'oldest_age_seconds': 0})
+        phoenix_job_queue_depth.labels(queue=queue).set(values['depth'])
+        phoenix_job_queue_oldest_age_seconds.labels(queue=queue).set(values['oldest_age_seconds'])
+    return stats
+
+
+def work(app, queues=('default',), batch_size=10, poll_interval=1.0, should_stop=lambda: False):
+    """Worker loop: claim and run jobs until asked to stop"""
+    with app.app_context():
+        # Never share pooled connections with a parent process
+        db.engine.dispose(close=False)
+        while not should_stop():
+            try:
+                jobs = claim_jobs(queues, batch_size)
+            except Exception as e:
+                db.session.rollback()
+                logger.error('Could not claim jobs: %s', e)
+                time.sleep(poll_interval)
+                continue
+            
+            if not jobs:
+                time.sleep(poll_interval)
+                continue
+            
+            for job in jobs:
+                run_job(job)
+            db.session.remove()
@@ -0,0 +1,266 @@
+"""
+Data Lifecycle - Partition Upkeep and Archival of Completed Flights
+"""
+from datetime import datetime, timedelta
+from prometheus_client import Counter
+from sqlalchemy import bindparam
+from models import db, Job
+from services.jobs import enqueue, task
+import click
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Range-partitioned tables and their partition key
+PARTITIONED_TABLES = {
+    'flights': 'scheduled_departure',
+    'bookings': 'booking_date',
+}
+PARTITION_NAME = re.compile(r'^(?P<parent>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$')
+
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+# Flights that arrived more than this many days ago are archived
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+LIFECYCLE_INTERVAL = int(os.getenv('LIFECYCLE_INTERVAL', 3600))
+
+phoenix_lifecycle_runs_total = Counter('phoenix_lifecycle_runs_total', 'Lifecycle maintenance runs', ['outcome'])
+
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _is_partitioned(table):
+    return db.session.execute(db.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table"
+    ), {'table': table}).first() is not None
+
+
+def _month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(value, months):
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, now=None):
+    """Create monthly partitions from this month through `months_ahead`
+
+    Months that already have rows in the default partition (written while
+    their partition was missing) get a partition too, with those rows
+    moved into it.
+    """
+    if not _is_postgres():
+        return []
+    
+    created = []
+    start = _month_start(now or datetime.now())
+    for table, key in PARTITIONED_TABLES.items():
+        if not _is_partitioned(table):
+            logger.warning('%s is not partitioned; run database/partitioning.sql', table)
+            continue
+        months = {_add_months(start, offset) for offset in range(months_ahead + 1)}
+        if _exists(f'{table}_default'):
+            months.update(db.session.execute(db.text(
+                f"SELECT DISTINCT date_trunc('month', {key}) FROM {table}_default WHERE {key} IS NOT NULL"
+            )).scalars())
+        for lower in sorted(months):
+            name = f'{table}_p{lower:%Y_%m}'
+            if _exists(name):
+                continue
+            moved = _create_partition(table, key, name, lower, _add_months(lower, 1))
+            # One short transaction per partition; moving rows locks the default
+            db.session.commit()
+            if moved:
+                logger.warning('Moved %d rows from %s_default into %s', moved, table, name)
+            created.append(name)
+    db.session.commit()
+    return created
+
+
+def _exists(name):
+    return db.session.execute(db.text('SELECT to_regclass(:name)'), {'name': name}).scalar() is not None
+
+
+def _create_partition(table, key, name, lower, upper):
+    """Create one monthly partition; returns rows moved out of the default partition"""
+    bounds = f"FOR VALUES FROM ('{lower:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+    default = f'{table}_default'
+    in_range = f'{key} >= :lower AND {key} < :upper'
+    params = {'lower': lower, 'upper': upper}
+    
+    stranded = _exists(default) and db.session.execute(
+        db.text(f'SELECT 1 FROM {default} WHERE {in_range} LIMIT 1'), params
+    ).first() is not None
+    if not stranded:
+        db.session.execute(db.text(f'CREATE TABLE {name} PARTITION OF {table} {bounds}'))
+        return 0
+    
+    # PARTITION OF fails while the default holds rows in range, so build the
+    # partition standalone, move the rows over, then attach it
+    db.session.execute(db.text(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    moved = db.session.execute(db.text(
+        f'WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved'
+    ), params).rowcount
+    db.session.execute(db.text(f'ALTER TABLE {table} ATTACH PARTITION {name} {bounds}'))
+    return moved
+
+
+def archive_completed_flights(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """Move finished flights with their bookings and baggage to archive tables
+
+    Each batch is its own short transaction so the live tables are never
+    locked for long. Returns the number of flights archived.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    lock = ' FOR UPDATE SKIP LOCKED' if _is_postgres() else ''
+    archived = 0
+    batches = 0
+    
+    while max_batches is None or batches < max_batches:
+        flight_ids = [row[0] for row in db.session.execute(db.text(
+            'SELECT flight_id FROM flights WHERE scheduled_arrival < :cutoff '
+            f'ORDER BY scheduled_arrival LIMIT :limit{lock}'
+        ), {'cutoff': cutoff, 'limit': batch_size})]
+        if not flight_ids:
+            break
+        
+        # Children first so nothing is left pointing at a missing parent
+        params = {'ids': flight_ids}
+        _move('baggage', 'booking_id IN (SELECT booking_id FROM bookings WHERE flight_id IN :ids)', params)
+        bookings = _move('bookings', 'flight_id IN :ids', params)
+        _move('flights', 'flight_id IN :ids', params)
+        db.session.commit()
+        
+        archived += len(flight_ids)
+        batches += 1
+        logger.info('Archived %d flights (%d bookings)', len(flight_ids), bookings)
+    
+    return archived
+
+
+def _move(table, where, params):
+    """Copy matching rows into <table>_archive and delete them; returns row count"""
+    ids = bindparam('ids', expanding=True)
+    db.session.execute(
+        db.text(f'INSERT INTO {table}_archive SELECT * FROM {table} WHERE {where}').bindparams(ids), params
+    )
+    return db.session.execute(
+        db.text(f'DELETE FROM {table} WHERE {where}').bindparams(ids), params
+    ).rowcount
+
+
+def drop_empty_partitions(older_than_days=ARCHIVE_AFTER_DAYS):
+    """Drop monthly partitions that ended before the archive cutoff and are empty"""
+    if not _is_postgres():
+        return []
+    
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    dropped = []
+    for table in PARTITIONED_TABLES:
+        partitions = db.session.execute(db.text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {'table': table}).scalars().all()
+        
+        for name in partitions:
+            match = PARTITION_NAME.match(name)
+            if not match or match.group('parent') != table:
+                continue
+            upper = _add_months(datetime(int(match.group('year')), int(match.group('month')), 1), 1)
+            if upper > cutoff:
+                continue
+            if db.session.execute(db.text(f'SELECT 1 FROM {name} LIMIT 1')).first() is None:
+                db.session.execute(db.text(f'DROP TABLE {name}'))
+                dropped.append(name)
+    db.session.commit()
+    return dropped
+
+
+def live_departure_range(day):
+    """Half-open datetime range for one day, so the planner can prune partitions"""
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+def schedule(task_name, delay=0, payload=None, waiting=('pending', 'running')):
+    """Enqueue a periodic lifecycle task unless one is already waiting
+
+    `waiting` lists the job statuses that count as already scheduled.
+    """
+    if _is_postgres():
+        # Concurrent callers must not each book a chain
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(hashtext(:task))'), {'task': task_name})
+    pending = Job.query.filter(Job.task == task_name, Job.status.in_(waiting)).first()
+    if pending:
+        db.session.commit()
+        return None
+    job = enqueue(task_name, payload, queue='maintenance', delay=delay)
+    db.session.commit()
+    return job
+
+
+@task('lifecycle.maintain')
+def run_maintenance(payload):
+    """Periodic job: create partitions, archive, drop empty partitions
+
+    Failures are logged and counted instead of raised, and the next run is
+    always booked: a job that failed permanently would end the chain. The
+    booking is deduplicated like schedule(), counting only pending jobs
+    (this one is running), so a rerun of this job after a worker crash or
+    a visibility-timeout reclaim doesn't fork a second chain.
+    """
+    try:
+        created = ensure_partitions()
+        archived = archive_completed_flights(max_batches=payload.get('max_batches', 20))
+        dropped = drop_empty_partitions()
+        logger.info('Lifecycle: created %s, archived %d flights, dropped %s', created, archived, dropped)
+        outcome = 'done'
+    except Exception:
+        db.session.rollback()
+        logger.exception('Lifecycle maintenance failed; next run in %ds', LIFECYCLE_INTERVAL)
+        outcome = 'failed'
+    phoenix_lifecycle_runs_total.labels(outcome=outcome).inc()
+    
+    schedule('lifecycle.maintain', delay=LIFECYCLE_INTERVAL, payload=payload, waiting=('pending',))
+
+
+@click.group('lifecycle')
+def lifecycle_cli():
+    """Partition and archive maintenance"""
+
+
+@lifecycle_cli.command('ensure-partitions')
+@click.option('--months-ahead', default=PARTITION_MONTHS_AHEAD, show_default=True)
+def ensure_partitions_command(months_ahead):
+    """Create upcoming monthly partitions"""
+    click.echo(f'Created: {ensure_partitions(months_ahead) or "nothing to do"}')
+
+
+@lifecycle_cli.command('archive')
+@click.option('--older-than-days', default=ARCHIVE_AFTER_DAYS, show_default=True)
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True)
+def archive_command(older_than_days, batch_size):
+    """Archive completed flights with their bookings and baggage"""
+    archived = archive_completed_flights(older_than_days, batch_size)
+    dropped = drop_empty_partitions(older_than_days)
+    click.echo(f'Archived {archived} flights; dropped partitions: {dropped or "none"}')
+
+
+@lifecycle_cli.command('schedule')
+def schedule_command():
+    """Start the periodic maintenance job on the 'maintenance' queue"""
+    job = schedule('lifecycle.maintain')
+    click.echo('Scheduled lifecycle.maintain' if job else 'lifecycle.maintain is already scheduled')
+
+
+def init_app(app):
+    app.cli.add_command(lifecycle_cli)
@@ -0,0 +1,354 @@
+"""
+Passenger Search - Ranked, Typo-Tolerant Booking Lookup for Agents
+"""
+from array import array
+from collections import Counter
+from flask import current_app
+from operator import itemgetter
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from models import db, Booking
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 'auto' uses pg_trgm when the extension is installed, else the in-process index
+PASSENGER_SEARCH_BACKEND = os.getenv('PASSENGER_SEARCH_BACKEND', 'auto')
+MIN_SCORE = float(os.getenv('PASSENGER_SEARCH_MIN_SCORE', 0.3))
+# How often the in-process index pulls new bookings from the database
+CATCH_UP_INTERVAL = float(os.getenv('PASSENGER_SEARCH_CATCH_UP', 2))
+LOAD_BATCH_SIZE = 5000
+# Above this many bookings the in-process index is refused; install pg_trgm.
+# Measured at 100k: ~650 bytes per booking (~65 MB per worker), 10-20 ms for
+# typical name queries and ~50 ms for very broad ones (an email domain).
+MAX_INDEX_ROWS = int(os.getenv('PASSENGER_SEARCH_MAX_ROWS', 100000))
+
+SEARCH_FIELDS = ('name', 'email', 'phone')
+
+
+class SearchUnavailable(RuntimeError):
+    """Raised when passenger search can't be served by this process"""
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse whitespace"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+def digits(text):
+    return re.sub(r'\D', '', text or '')
+
+
+def trigrams(text):
+    """Padded character trigrams, pg_trgm style"""
+    grams = set()
+    for word in re.split(r'[^\w@.]+', text):
+        if word:
+            padded = f'  {word} '
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def booking_fields(booking):
+    """Normalized searchable fields of a booking"""
+    return {
+        'name': normalize(f'{booking.customer_first_name or ""} {booking.customer_last_name or ""}'),
+        'email': normalize(booking.customer_email),
+        'phone': digits(booking.customer_phone),
+    }
+
+
+class TrigramIndex:
+    """Portable in-process n-gram index over bookings
+
+    Postings are compact arrays of booking ids per (field, trigram); a query
+    is scored by counting the trigrams each booking shares with it. Bookings
+    are only appended, by one background thread (start_sync) that loads the
+    table and then polls for new rows. Searches take no lock: they only use
+    single dict lookups and array reads, which are atomic in CPython, and a
+    booking is searchable once its trigram counts are published in `_sizes`.
+    """
+    
+    def __init__(self):
+        self._postings = {}   # (field, trigram) -> array of booking ids
+        self._sizes = {}      # booking id -> trigram count per SEARCH_FIELDS entry
+        self._last_id = 0     # highest booking id loaded from the database
+        self._lock = threading.Lock()   # serialises writers
+        self._syncer = None
+        self.ready = threading.Event()
+        self.disabled = False
+    
+    def __len__(self):
+        return len(self._sizes)
+    
+    def add(self, booking_id, fields):
+        """Index one booking; ids already indexed are ignored"""
+        with self._lock:
+            if booking_id in self._sizes:
+                return
+            sizes = []
+            for field in SEARCH_FIELDS:
+                grams = trigrams(fields.get(field) or '')
+                sizes.append(len(grams))
+                for gram in grams:
+                    postings = self._postings.get((field, gram))
+                    if postings is None:
+                        postings = self._postings[(field, gram)] = array('q')
+                    postings.append(booking_id)
+            self._sizes[booking_id] = tuple(sizes)
+    
+    def add_booking(self, booking):
+        self.add(booking.booking_id, booking_fields(booking))
+    
+    def remove(self, booking_id):
+        """Forget a booking; its leftover postings are skipped when scoring"""
+        self._sizes.pop(booking_id, None)
+    
+    def catch_up(self, max_batches=None):
+        """Load bookings newer than the highest loaded id; returns how many"""
+        loaded = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            # Plain rows, not entities, so a full load doesn't fill the identity map
+            batch = db.session.query(
+                Booking.booking_id, Booking.customer_first_name, Booking.customer_last_name,
+                Booking.customer_email, Booking.customer_phone
+            ).filter(Booking.booking_id > self._last_id).order_by(Booking.booking_id).limit(LOAD_BATCH_SIZE).all()
+            for row in batch:
+                self.add_booking(row)
+            if batch:
+                self._last_id = batch[-1].booking_id
+            loaded += len(batch)
+            batches += 1
+            if len(batch) < LOAD_BATCH_SIZE:
+                break
+        return loaded
+    
+    def start_sync(self, app):
+        """Load all bookings, then poll for new ones, in a background thread (once per process)"""
+        with self._lock:
+            if self._syncer is not None or self.disabled:
+                return
+            self._syncer = threading.Thread(target=self._sync, args=(app,), name='passenger-index', daemon=True)
+        self._syncer.start()
+    
+    def _sync(self, app):
+        with app.app_context():
+            try:
+                rows = db.session.query(func.count(Booking.booking_id)).scalar()
+                if rows > MAX_INDEX_ROWS:
+                    self._disable(rows)
+                    return
+                start = time.monotonic()
+                self.catch_up()
+                self.ready.set()
+                logger.info('Passenger index built: %d bookings in %.1fs', len(self), time.monotonic() - start)
+            except Exception as e:
+                logger.error('Passenger index build failed: %s', e)
+                # Let the next search try again
+                self._syncer = None
+                return
+            finally:
+                db.session.remove()
+            
+            while not self.disabled:
+                time.sleep(CATCH_UP_INTERVAL)
+                try:
+                    self.catch_up()
+                except Exception as e:
+                    logger.warning('Passenger index catch-up failed: %s', e)
+                finally:
+                    db.session.remove()
+                if len(self) > MAX_INDEX_ROWS:
+                    self._disable(len(self))
+    
+    def _disable(self, rows):
+        self.disabled = True
+        with self._lock:
+            self._postings = {}
+            self._sizes = {}
+        logger.error('%d bookings exceed PASSENGER_SEARCH_MAX_ROWS (%d); in-process passenger search is '
+                     'disabled, install pg_trgm (database/passenger_search.sql)', rows, MAX_INDEX_ROWS)
+    
+    def search(self, query, limit=20, min_score=MIN_SCORE):
+        """Return [(booking_id, score)] best first
+
+        Score is the share of query trigrams found in the best matching
+        field (like pg_trgm word_similarity), so partial names and typos
+        still match; ties break towards the tighter match.
+        """
+        kinds = [(trigrams(normalize(query)), ('name', 'email'))]
+        query_digits = digits(query)
+        if len(query_digits) >= 3:
+            kinds.append((trigrams(query_digits), ('phone',)))
+        
+        postings = self._postings
+        sizes = self._sizes
+        best = {}
+        for grams, fields in kinds:
+            if not grams:
+                continue
+            needed = max(1, math.ceil(len(grams) * min_score))
+            for field in fields:
+                position = SEARCH_FIELDS.index(field)
+                counts = Counter()
+                for gram in grams:
+                    counts.update(postings.get((field, gram), ()))
+                # Only the best overlaps can reach the top `limit`; find the
+                # cutoff from the overlap histogram instead of scoring everyone
+                cutoff = needed
+                seen = 0
+                for overlap, bookings in sorted(Counter(counts.values()).items(), reverse=True):
+                    if overlap < needed:
+                        break
+                    cutoff = overlap
+                    seen += bookings
+                    if seen >= limit:
+                        break
+                for booking_id in [b for b, overlap in counts.items() if overlap >= cutoff]:
+                    overlap = counts[booking_id]
+                    size = sizes.get(booking_id)
+                    if size is None:
+                        continue
+                    score = (overlap / len(grams), overlap / (len(grams) + size[position] - overlap))
+                    if score > best.get(booking_id, (0, 0)):
+                        best[booking_id] = score
+        
+        ranked = heapq.nlargest(limit, best.items(), key=itemgetter(1))
+        return [(booking_id, round(score[0], 3)) for booking_id, score in ranked]
+
+
+class PgTrigramSearch:
+    """pg_trgm backed search using the GIN indexes in database/passenger_search.sql"""
+    
+    NAME = "lower(coalesce(customer_first_name, '') || ' ' || coalesce(customer_last_name, ''))"
+    EMAIL = "lower(coalesce(customer_email, ''))"
+    PHONE = "regexp_replace(coalesce(customer_phone, ''), '\\D', '', 'g')"
+    
+    def search(self, query, limit=20, min_score=MIN_SCORE):
+        text = normalize(query)
+        phone = digits(query) if len(digits(query)) >= 3 else None
+        score = (f"GREATEST(word_similarity(:q, {self.NAME}), word_similarity(:q, {self.EMAIL})"
+                 + (f", word_similarity(:phone, {self.PHONE})" if phone else '') + ')')
+        match = f"(:q <% {self.NAME} OR :q <% {self.EMAIL}" + (f" OR :phone <% {self.PHONE}" if phone else '') + ')'
+        
+        # Session-local threshold so `<%` can use the GIN indexes
+        db.session.execute(db.text('SELECT set_config(\'pg_trgm.word_similarity_threshold\', :t, true)'),
+                           {'t': str(min_score)})
+        rows = db.session.execute(db.text(
+            f'SELECT booking_id, {score} AS score FROM bookings WHERE {match} '
+            'ORDER BY score DESC, booking_id DESC LIMIT :limit'
+        ), {'q': text, 'phone': phone, 'limit': limit}).all()
+        return [(row.booking_id, round(float(row.score), 3)) for row in rows]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    """Pick (once per process) the search backend"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _choose_backend()
+    return _backend
+
+
+def _choose_backend():
+    if PASSENGER_SEARCH_BACKEND != 'memory' and db.engine.dialect.name == 'postgresql':
+        installed = db.session.execute(db.text(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+        )).first()
+        if installed:
+            return PgTrigramSearch()
+        logger.warning('pg_trgm is not installed; using the in-process passenger index')
+    return TrigramIndex()
+
+
+def search_ready():
+    """False while the in-process index is still loading (results may be partial)"""
+    engine = backend()
+    return not isinstance(engine, TrigramIndex) or engine.ready.is_set()
+
+
+def search_bookings(query, limit=20):
+    """Ranked bookings for an agent query (reference, name, email or phone)"""
+    query = (query or '').strip()
+    if len(query) < 2:
+        return []
+    
+    engine = backend()
+    if isinstance(engine, TrigramIndex):
+        if engine.disabled:
+            raise SearchUnavailable(
+                f'More than {MAX_INDEX_ROWS} bookings for the in-process index; '
+                'install pg_trgm (database/passenger_search.sql)')
+        # Loading and catching up happen in the background, never in a request
+        engine.start_sync(current_app._get_current_object())
+    
+    # An exact booking reference always ranks first
+    results = []
+    if len(query) == 6:
+        exact = Booking.query.filter_by(booking_reference=query.upper()).first()
+        if exact:
+            results.append((exact.booking_id, 1.0))
+    results += [r for r in engine.search(query, limit) if not results or r[0] != results[0][0]]
+    results = results[:limit]
+    
+    bookings = {
+        b.booking_id: b for b in Booking.query.options(joinedload(Booking.flight))
+        .filter(Booking.booking_id.in_([booking_id for booking_id, _ in results]))
+    } if results else {}
+    
+    matches = []
+    for booking_id, score in results:
+        booking = bookings.get(booking_id)
+        if booking is None:
+            # Archived since it was indexed
+            if isinstance(engine, TrigramIndex):
+                engine.remove(booking_id)
+            continue
+        matches.append({
+            'booking_reference': booking.booking_reference,
+            'name': f'{booking.customer_first_name} {booking.customer_last_name}',
+            'email': booking.customer_email,
+            'phone': booking.customer_phone,
+            'flight_number': booking.flight.flight_number if booking.flight else None,
+            'departure': booking.flight.scheduled_departure.isoformat() if booking.flight else None,
+            'status': booking.status,
+            'score': score,
+        })
+    return matches
+
+
+def init_app(app):
+    """Start loading the in-process index at startup unless disabled (tests, job workers)"""
+    if not app.config.get('PASSENGER_SEARCH_WARM_UP', not app.config.get('TESTING')):
+        return
+    
+    def warm_up():
+        with app.app_context():
+            try:
+                engine = backend()
+            except Exception as e:
+                logger.warning('Passenger search backend not chosen at startup: %s', e)
+                return
+            finally:
+                db.session.remove()
+            if isinstance(engine, TrigramIndex):
+                engine.start_sync(app)
+    
+    threading.Thread(target=warm_up, name='passenger-search-warm-up', daemon=True).start()
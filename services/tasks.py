@@ -0,0 +1,38 @@
+"""
+Background Tasks - Post-Booking Side Effects Run by the Job Worker
+"""
+from services.jobs import task
+from models import Booking, Baggage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@task('booking.confirmation_email')
+def send_booking_confirmation(payload):
+    """Send the booking confirmation to the customer"""
+    booking = Booking.query.filter_by(booking_reference=payload['booking_reference']).first()
+    if not booking:
+        raise LookupError(f"Booking {payload['booking_reference']} not found")
+    logger.info('Booking confirmation for %s sent to %s', booking.booking_reference, booking.customer_email)
+
+
+@task('checkin.boarding_pass')
+def issue_boarding_pass(payload):
+    """Generate and deliver the boarding pass after check-in"""
+    booking = Booking.query.filter_by(booking_reference=payload['booking_reference']).first()
+    if not booking:
+        raise LookupError(f"Booking {payload['booking_reference']} not found")
+    logger.info('Boarding pass for %s seat %s sent to %s',
+                booking.booking_reference, booking.seat_number, booking.customer_email)
+
+
+@task('baggage.status_notification')
+def notify_baggage_status(payload):
+    """Tell the passenger their bag has changed status"""
+    baggage = Baggage.query.filter_by(baggage_tag=payload['baggage_tag']).first()
+    if not baggage:
+        raise LookupError(f"Baggage {payload['baggage_tag']} not found")
+    email = baggage.booking.customer_email if baggage.booking else None
+    logger.info('Baggage %s is now %s at %s (notified %s)',
+                baggage.baggage_tag, baggage.status, baggage.current_location, email)
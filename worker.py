@@ -0,0 +1,102 @@
+"""
+Phoenix Air - Background Job Worker
+
+Usage: python worker.py [--processes N] [--queue default --queue maintenance]
+
+Job metrics from every worker process are served on --metrics-port
+(WORKER_METRICS_PORT, default 9101) for Prometheus to scrape.
+"""
+from dotenv import load_dotenv
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+
+load_dotenv()
+
+# Kept apart from the web's PROMETHEUS_MULTIPROC_DIR, which gunicorn wipes on start
+WORKER_METRICS_DIR = os.getenv('WORKER_METRICS_DIR', '/tmp/phoenix-worker-prometheus')
+WORKER_METRICS_PORT = int(os.getenv('WORKER_METRICS_PORT', 9101))
+
+_stopping = multiprocessing.Event()
+
+
+def _serve_metrics(port):
+    """Aggregate metrics written by all worker processes and serve them over HTTP"""
+    from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+
+
+def _run(queues, batch_size, poll_interval):
+    """Entry point for one worker process"""
+    signal.signal(signal.SIGTERM, lambda *_: _stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: _stopping.set())
+    
+    from app import create_app
+    from models import db
+    from services.jobs import work
+    from services.lifecycle import schedule
+    import services.tasks  # noqa: F401 - registers task handlers
+    
+    app = create_app({'HEALTH_BACKGROUND_REFRESH': False, 'PASSENGER_SEARCH_WARM_UP': False})
+    if 'maintenance' in queues:
+        # Start (or restart) the maintenance chain; a no-op if a run is booked
+        with app.app_context():
+            try:
+                schedule('lifecycle.maintain')
+            except Exception as e:
+                db.session.rollback()
+                logging.getLogger(__name__).error('Could not schedule lifecycle.maintain: %s', e)
+            db.session.remove()
+    
+    work(app, queues=queues, batch_size=batch_size, poll_interval=poll_interval, should_stop=_stopping.is_set)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run Phoenix Air background job workers')
+    parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--queue', action='append', dest='queues', help='Queue to consume (repeatable)')
+    parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per poll')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when idle')
+    parser.add_argument('--metrics-port', type=int, default=WORKER_METRICS_PORT,
+                        help='Port for the Prometheus exporter (0 disables it)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(levelname)s %(message)s')
+    
+    # Must be set before prometheus_client is imported by any process
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = WORKER_METRICS_DIR
+    shutil.rmtree(WORKER_METRICS_DIR, ignore_errors=True)
+    os.makedirs(WORKER_METRICS_DIR, exist_ok=True)
+    if args.metrics_port:
+        _serve_metrics(args.metrics_port)
+    
+    from services.jobs import QUEUES
+    queues = tuple(args.queues or QUEUES)
+    
+    if args.processes <= 1:
+        _run(queues, args.batch_size, args.poll_interval)
+        return
+    
+    workers = [
+        multiprocessing.Process(target=_run, args=(queues, args.batch_size, args.poll_interval),
+                                name=f'worker-{i}')
+        for i in range(args.processes)
+    ]
+    for p in workers:
+        p.start()
+    
+    signal.signal(signal.SIGTERM, lambda *_: _stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: _stopping.set())
+    from prometheus_client import multiprocess
+    for p in workers:
+        p.join()
+        multiprocess.mark_process_dead(p.pid)
+
+
+if __name__ == '__main__':
+    main()